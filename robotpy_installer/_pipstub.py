@@ -20,4 +20,15 @@ if __name__ == "__main__":
     platform.system = lambda: "Linux"
     platform.python_version = lambda: "3.13.0"
 
-    runpy.run_module("pip", run_name="__main__")
+    # pip's __main__ does this to avoid importing from the cwd
+    if sys.path[0] in ("", os.getcwd()):
+        sys.path.pop(0)
+
+    # Same as 'python -m pip', but without runpy locating and compiling
+    # pip's __main__ module first
+    try:
+        from pip._internal.cli.main import main as pip_main
+    except ImportError:
+        runpy.run_module("pip", run_name="__main__")
+    else:
+        sys.exit(pip_main())
@@ -1,13 +1,20 @@
+import concurrent.futures
 import logging
+import os
 import pathlib
+import shutil
 import threading
+from http import HTTPStatus
 from http.server import SimpleHTTPRequestHandler
-from typing import Dict
+from typing import Dict, Optional
 
 from robotpy_installer.sshcontroller import SshController
 
 logger = logging.getLogger("cacheserver")
 
+# How often (in seconds) the accept loop checks whether it should stop
+_ACCEPT_TIMEOUT = 0.25
+
 
 class HTTPHandler(SimpleHTTPRequestHandler):
     def __init__(self, mapped_files, *args, **kwargs):
@@ -17,14 +24,37 @@ class HTTPHandler(SimpleHTTPRequestHandler):
     def log_message(self, format: str, *args) -> None:
         logger.debug(f"%s {format}", self.address_string(), *args)
 
-    def translate_path(self, path):
-        xpath = path.split("?", 1)[0]
-        xpath = xpath.split("#", 1)[0]
-        redirect = self.mapped_files.get(xpath)
-        if redirect:
-            return redirect
+    def send_head(self):
+        xpath = self.path.partition("?")[0].partition("#")[0]
+        local_file = self.mapped_files.get(xpath)
+        if not local_file:
+            # directory listings (pip's --find-links) and other cache files
+            return super().send_head()
+
+        # Mapped files are always regular files, so skip the directory,
+        # redirect and If-Modified-Since handling done by the base class
+        try:
+            f = open(local_file, "rb")
+        except OSError:
+            self.send_error(HTTPStatus.NOT_FOUND, "File not found")
+            return None
 
-        return super().translate_path(path)
+        try:
+            self.send_response(HTTPStatus.OK)
+            self.send_header("Content-type", self.guess_type(local_file))
+            self.send_header("Content-Length", str(os.fstat(f.fileno()).st_size))
+            self.end_headers()
+        except:
+            f.close()
+            raise
+
+        return f
+
+    def copyfile(self, source, outputfile):
+        # The output is a paramiko channel, whose fileno() is an event pipe
+        # and not a socket, so os.sendfile can't be used. Larger chunks at
+        # least cut down on the number of copies for big wheels.
+        shutil.copyfileobj(source, outputfile, 1024 * 1024)
 
 
 class CacheServer:
@@ -32,19 +62,39 @@ class CacheServer:
         self.controller = ssh_controller
         self.cache_root = cache_root
 
-        self.transport = self.controller.client.get_transport()
-        assert self.transport is not None
+        self.transport = self.controller.transport
         self.port = self.transport.request_port_forward("", 0)
 
         self.mapped_files: Dict[str, str] = {}
 
+        # pip can issue a lot of requests, reuse threads to service them
+        self._pool = concurrent.futures.ThreadPoolExecutor(
+            max_workers=8, thread_name_prefix="cacheserver"
+        )
+
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
     def add_mapping(self, fname: str, local_file: str):
         self.mapped_files[fname] = local_file
 
     def start(self):
-        t = threading.Thread(target=self._handle_requests)
-        t.setDaemon(True)
-        t.start()
+        self._thread = threading.Thread(target=self._handle_requests, daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self._stop_event.set()
+        try:
+            self.transport.cancel_port_forward("", self.port)
+        except Exception:
+            # the connection may already be gone
+            pass
+
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+        self._pool.shutdown(wait=False)
 
     def process_request(self, request):
         client_address = request.getpeername()
@@ -63,11 +113,8 @@ class CacheServer:
             request.close()
 
     def _handle_requests(self):
-        request = self.transport.accept()
-
-        while request is not None:
-            t = threading.Thread(target=self.process_request, args=[request])
-            t.setDaemon(True)
-            t.start()
-
-            request = self.transport.accept()
+        # Wake up periodically so that close() can stop this thread
+        while not self._stop_event.is_set() and self.transport.is_active():
+            request = self.transport.accept(_ACCEPT_TIMEOUT)
+            if request is not None:
+                self._pool.submit(self.process_request, request)
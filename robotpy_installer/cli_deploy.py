@@ -1,36 +1,48 @@
 import argparse
+import concurrent.futures
 import contextlib
 import datetime
 import getpass
+import importlib.util
+import io
 import json
+import marshal
+import operator
 import os
 import pathlib
-import shutil
 import socket
 import subprocess
 import sys
-import tempfile
+import tarfile
 import threading
+import time
 import typing
 
-from os.path import join, splitext
+from os.path import join
 
-from . import pypackages, pyproject, roborio_utils, sshcontroller
-from .installer import PipInstallError, PythonMissingError, RobotpyInstaller
-from .errors import Error
+from .errors import Error, SshExecError
 from .utils import handle_cli_error, print_err, yesno
 
+# the rest of the installer (and paramiko) is only imported when a deploy
+# is actually run, as all robotpy commands are loaded at startup
+if typing.TYPE_CHECKING:
+    from . import pypackages, pyproject, sshcontroller
+    from .installer import RobotpyInstaller
+
 import logging
 
 logger = logging.getLogger("deploy")
 
+# file extensions that are never uploaded to the robot
+_IGNORE_EXTS = frozenset({".pyc", ".whl", ".ipk", ".zip", ".gz", ".wpilog"})
+
 
 @contextlib.contextmanager
 def wrap_ssh_error(msg: str):
     try:
         yield
-    except sshcontroller.SshExecError as e:
-        raise sshcontroller.SshExecError(f"{msg}: {str(e)}", e.retval) from e
+    except SshExecError as e:
+        raise SshExecError(f"{msg}: {str(e)}", e.retval) from e
 
 
 class Deploy:
@@ -141,8 +153,8 @@ class Deploy:
             help="If specified, don't do a DNS lookup, allow ssh et al to do it instead",
         )
 
-        self._packages_in_cache: typing.Optional[pypackages.Packages] = None
-        self._robot_packages: typing.Optional[pypackages.Packages] = None
+        self._packages_in_cache: typing.Optional["pypackages.Packages"] = None
+        self._robot_packages: typing.Optional["pypackages.Packages"] = None
 
     @handle_cli_error
     def run(
@@ -165,6 +177,18 @@ class Deploy:
         team: typing.Optional[int],
         no_resolve: bool,
     ):
+        from . import sshcontroller
+
+        # Loading the project and checking the local requirements doesn't
+        # depend on the test results, so do it while the tests are running
+        project_future = None
+        if not skip_tests and not no_install:
+            executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+            project_future = executor.submit(
+                self._load_project, project_path, no_verify
+            )
+            executor.shutdown(wait=False)
+
         # run the test suite before uploading
         if not skip_tests:
             test_args = [
@@ -207,11 +231,11 @@ class Deploy:
         project = None
 
         if not no_install:
-            try:
-                project = pyproject.load(project_path, default_if_missing=True)
-            except pyproject.NoRobotpyError as e:
-                raise pyproject.NoRobotpyError(
-                    f"{e}\n\nUse --no-install to ignore this error (not recommended)"
+            if project_future is not None:
+                project, requirements_met, desc = project_future.result()
+            else:
+                project, requirements_met, desc = self._load_project(
+                    project_path, no_verify
                 )
 
             logger.info("Robot project requirements:")
@@ -221,7 +245,6 @@ class Deploy:
             if no_verify:
                 logger.warning("Not checking to see if they are installed on RoboRIO")
             else:
-                requirements_met, desc = project.are_local_requirements_met()
                 if not requirements_met:
                     logger.warning(
                         "The following project requirements were not installed locally:"
@@ -263,6 +286,28 @@ class Deploy:
         print("\nSUCCESS: Deploy was successful!")
         return 0
 
+    def _load_project(
+        self, project_path: pathlib.Path, no_verify: bool
+    ) -> typing.Tuple["pyproject.RobotPyProjectToml", bool, typing.List[str]]:
+        """
+        Loads the project and determines whether its requirements are
+        installed locally
+        """
+        from . import pyproject
+
+        try:
+            project = pyproject.load(project_path, default_if_missing=True)
+        except pyproject.NoRobotpyError as e:
+            raise pyproject.NoRobotpyError(
+                f"{e}\n\nUse --no-install to ignore this error (not recommended)"
+            )
+
+        if no_verify:
+            return project, True, []
+
+        requirements_met, desc = project.are_local_requirements_met()
+        return project, requirements_met, desc
+
     def _generate_build_data(self, project_path: pathlib.Path) -> dict:
         """
         Generate a deploy.json
@@ -275,41 +320,42 @@ class Deploy:
             "code-path": str(project_path),
         }
 
-        # Test if we're in a git repo or not
+        # Test if we're in a git repo and get the hash/branch with a single
+        # rev-parse, and describe the repo at the same time (describe just
+        # fails if this isn't a git repo)
         try:
-            revParseProcess = subprocess.run(
-                args=["git", "rev-parse", "--is-inside-work-tree"],
-                capture_output=True,
+            revParseProc = subprocess.Popen(
+                args=[
+                    "git",
+                    "rev-parse",
+                    "--is-inside-work-tree",
+                    "HEAD",
+                    "--abbrev-ref",
+                    "HEAD",
+                ],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                text=True,
+            )
+            descProc = subprocess.Popen(
+                args=["git", "describe", "--dirty=-dirty", "--always"],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                text=True,
             )
-            in_git_repo = revParseProcess.stdout.decode().strip() == "true"
         except FileNotFoundError:
             in_git_repo = False
+        else:
+            revParse = revParseProc.communicate()[0].splitlines() + ["", "", ""]
+            desc = descProc.communicate()[0]
+            in_git_repo = revParse[0].strip() == "true"
 
         # If we're in a git repo
         if in_git_repo:
-            try:
-                hashProc = subprocess.run(
-                    args=["git", "rev-parse", "HEAD"], capture_output=True
-                )
-
-                # Describe this repo
-                descProc = subprocess.run(
-                    args=["git", "describe", "--dirty=-dirty", "--always"],
-                    capture_output=True,
-                )
-
-                # Get the branch name
-                nameProc = subprocess.run(
-                    args=["git", "rev-parse", "--abbrev-ref", "HEAD"],
-                    capture_output=True,
-                )
-
-                # Insert this data into our deploy.json dict
-                deploy_data["git-hash"] = hashProc.stdout.decode().strip()
-                deploy_data["git-desc"] = descProc.stdout.decode().strip()
-                deploy_data["git-branch"] = nameProc.stdout.decode().strip()
-            except subprocess.CalledProcessError as e:
-                logging.exception(e)
+            # Insert this data into our deploy.json dict
+            deploy_data["git-hash"] = revParse[1].strip()
+            deploy_data["git-desc"] = desc.strip()
+            deploy_data["git-branch"] = revParse[2].strip()
         else:
             logging.info("Not including git hash in deploy.json: Not a git repo.")
 
@@ -319,14 +365,18 @@ class Deploy:
         large_sz = 250000
 
         large_files = []
-        for fname in self._copy_to_tmpdir(pathlib.Path(), robot_path, dry_run=True):
-            st = os.stat(fname)
-            if st.st_size > large_sz:
-                large_files.append((fname, st.st_size))
+        for entry, _ in self._iter_upload_files(robot_path):
+            if entry.is_dir():
+                continue
+
+            size = entry.stat().st_size
+            if size > large_sz:
+                large_files.append((entry.path, size))
 
         if large_files:
             print_err(f"ERROR: large files found (larger than {large_sz} bytes)")
-            for fname, sz in sorted(large_files):
+            large_files.sort(key=operator.itemgetter(1), reverse=True)
+            for fname, sz in large_files:
                 print_err(f"- {fname} ({sz} bytes)")
 
             if not yesno("Upload anyways?"):
@@ -334,7 +384,11 @@ class Deploy:
 
         return True
 
-    def _get_cached_packages(self, installer: RobotpyInstaller) -> pypackages.Packages:
+    def _get_cached_packages(
+        self, installer: "RobotpyInstaller"
+    ) -> "pypackages.Packages":
+        from . import pypackages
+
         if self._packages_in_cache is None:
             self._packages_in_cache = pypackages.get_pip_cache_packages(
                 installer.cache_root
@@ -342,8 +396,10 @@ class Deploy:
         return self._packages_in_cache
 
     def _get_robot_packages(
-        self, ssh: sshcontroller.SshController
-    ) -> pypackages.Packages:
+        self, ssh: "sshcontroller.SshController"
+    ) -> "pypackages.Packages":
+        from . import pypackages, roborio_utils
+
         if self._robot_packages is None:
             rio_packages = roborio_utils.get_rio_py_packages(ssh)
             self._robot_packages = pypackages.make_packages(rio_packages)
@@ -351,37 +407,41 @@ class Deploy:
 
     def _ensure_requirements(
         self,
-        project: typing.Optional[pyproject.RobotPyProjectToml],
+        project: typing.Optional["pyproject.RobotPyProjectToml"],
         project_path: pathlib.Path,
         main_file: pathlib.Path,
-        ssh: sshcontroller.SshController,
+        ssh: "sshcontroller.SshController",
         ignore_image_version: bool,
         no_install: bool,
         force_install: bool,
         no_uninstall: bool,
     ):
-        python_exists = False
+        from . import pypackages, roborio_utils
+        from .installer import PipInstallError, PythonMissingError, RobotpyInstaller
+
         requirements_installed = False
 
         installer = RobotpyInstaller()
 
-        # Has the kill script been updated
-        with wrap_ssh_error("checking kill script"):
-            kill_script_updated = roborio_utils.check_kill_script(ssh)
-            if not kill_script_updated:
-                logger.warning("Need to update frcKillRobot.sh")
+        # Find out what needs to be done in a single round trip -- this
+        # also clears C++/Java user programs
+        with wrap_ssh_error("checking robot state"):
+            state = roborio_utils.probe_deploy_state(
+                ssh, get_py_packages=not no_install and not force_install
+            )
 
-        # does c++/java exist
-        with wrap_ssh_error("removing c++/java user programs"):
-            cpp_java_exists = not roborio_utils.uninstall_cpp_java_lvuser(ssh)
+        if state.py_packages is not None:
+            self._robot_packages = pypackages.make_packages(state.py_packages)
 
-        # does python exist
-        with wrap_ssh_error("checking if python exists"):
-            python_exists = (
-                ssh.exec_cmd("[ -x /usr/local/bin/python3 ]").returncode == 0
-            )
-            if not python_exists:
-                logger.warning("Python is not installed on RoboRIO")
+        kill_script_updated = state.kill_script_updated
+        if not kill_script_updated:
+            logger.warning("Need to update frcKillRobot.sh")
+
+        cpp_java_exists = state.cpp_java_exists
+
+        python_exists = state.python_exists
+        if not python_exists:
+            logger.warning("Python is not installed on RoboRIO")
 
         if python_exists:
             if no_install:
@@ -529,13 +589,15 @@ class Deploy:
 
     def _do_deploy(
         self,
-        ssh: sshcontroller.SshController,
+        ssh: "sshcontroller.SshController",
         debug: bool,
         nc: bool,
         nc_ds: bool,
         robot_filename: str,
         project_path: pathlib.Path,
     ) -> bool:
+        from .installer import _ROBOTPY_PYTHON_VERSION_NUM
+
         # This probably should be configurable... oh well
 
         deploy_dir = pathlib.PurePosixPath("/home/lvuser")
@@ -565,6 +627,19 @@ class Deploy:
             deployed_cmd_fname = "robotCommand"
             bash_cmd = "/bin/bash -ce"
 
+        # .pyc files are specific to the python version, so they can only be
+        # compiled here if we're the same version of python as the robot
+        compile_locally = (
+            sys.implementation.cache_tag == f"cpython-{_ROBOTPY_PYTHON_VERSION_NUM}"
+        )
+        if compile_locally:
+            compileall_cmd = ""
+        else:
+            compileall_cmd = (
+                f"/usr/local/bin/python3 {compileall_flags} "
+                "-m compileall -q -r 5 /home/lvuser/py;"
+            )
+
         py_new_deploy_dir = deploy_dir / py_new_deploy_subdir
         replace_cmd = f"rm -rf {py_deploy_dir}; mv {py_new_deploy_dir} {py_deploy_dir}"
 
@@ -580,22 +655,37 @@ class Deploy:
         with wrap_ssh_error("removing stale deploy directory"):
             ssh.exec_cmd(f"rm -rf {py_new_deploy_dir}", check=True)
 
-        # Copy the files over, copy to a temporary directory first
-        # -> this is inefficient, but it's easier in sftp
-        tmp_dir = pathlib.Path(tempfile.mkdtemp())
-        try:
-            py_tmp_dir = tmp_dir / py_new_deploy_subdir
-            # Copy robot path contents to new deploy subdir
-            self._copy_to_tmpdir(py_tmp_dir, project_path)
-
-            # Copy 'build' artifacts to new deploy subdir
-            with open(py_tmp_dir / "deploy.json", "w") as outf:
-                json.dump(self._generate_build_data(project_path), outf)
+        # Send the project files and build data to the robot as a single tar
+        # stream, read straight from the project directory
+        with wrap_ssh_error("uploading robot code"):
+            with ssh.tar_upload(str(deploy_dir)) as tar:
+                for entry, arcname in self._iter_upload_files(project_path):
+                    remote_fname = f"{py_new_deploy_subdir}/{arcname}"
+
+                    # directories are added too, so empty ones are created
+                    tar.add(entry.path, arcname=remote_fname, recursive=False)
+                    if entry.is_dir():
+                        continue
+
+                    print(arcname, "->", deploy_dir / remote_fname)
+
+                    if compile_locally and arcname.endswith(".py"):
+                        self._add_pyc(
+                            tar,
+                            entry,
+                            remote_fname.replace(os.sep, "/"),
+                            f"{py_deploy_dir}/{arcname}".replace(os.sep, "/"),
+                            0 if debug else 1,
+                        )
 
-            # sftp new deploy subdir to robot
-            ssh.sftp(py_tmp_dir, deploy_dir, mkdir=True)
-        finally:
-            shutil.rmtree(tmp_dir)
+                # Copy 'build' artifacts to new deploy subdir
+                deploy_json = json.dumps(
+                    self._generate_build_data(project_path), separators=(",", ":")
+                ).encode("utf-8")
+                info = tarfile.TarInfo(f"{py_new_deploy_subdir}/deploy.json")
+                info.size = len(deploy_json)
+                info.mtime = int(time.time())
+                tar.addfile(info, io.BytesIO(deploy_json))
 
         # start the netconsole listener now if requested, *before* we
         # actually start the robot code, so we can see all messages
@@ -607,11 +697,10 @@ class Deploy:
         sshcmd = (
             f"{bash_cmd} '"
             f"{replace_cmd};"
-            f"/usr/local/bin/python3 {compileall_flags} -m compileall -q -r 5 /home/lvuser/py;"
+            f"{compileall_cmd}"
             ". /etc/profile.d/frc-path.sh; "
             ". /etc/profile.d/natinst-path.sh; "
-            f"chown -R lvuser:ni {py_deploy_dir}; "
-            "sync; "
+            f"sync -f {py_deploy_dir} 2>/dev/null || sync; "
             "/usr/local/frc/bin/frcKillRobot.sh -t -r || true"
             "'"
         )
@@ -626,7 +715,52 @@ class Deploy:
 
         return True
 
-    def _start_nc(self, ssh: sshcontroller.SshController, nc_ds: bool):
+    def _add_pyc(
+        self,
+        tar: tarfile.TarFile,
+        entry: os.DirEntry,
+        arcname: str,
+        robot_fname: str,
+        optimize: int,
+    ):
+        """
+        Compiles a python file and adds it to the tar as the .pyc that
+        python on the robot would have written for it
+        """
+        st = entry.stat()
+        with open(entry.path, "rb") as fp:
+            source = fp.read()
+
+        try:
+            code = compile(
+                source, robot_fname, "exec", dont_inherit=True, optimize=optimize
+            )
+        except (SyntaxError, ValueError) as e:
+            # same as compileall failing on the robot, don't start broken code
+            raise Error(f"could not compile {entry.path}: {e}") from e
+
+        # timestamp based pyc: the robot validates it against the mtime and
+        # size of the .py file, which tar preserves when extracting
+        data = b"".join(
+            (
+                importlib.util.MAGIC_NUMBER,
+                (0).to_bytes(4, "little"),
+                (int(st.st_mtime) & 0xFFFFFFFF).to_bytes(4, "little"),
+                (st.st_size & 0xFFFFFFFF).to_bytes(4, "little"),
+                marshal.dumps(code),
+            )
+        )
+
+        pyc_name = importlib.util.cache_from_source(
+            arcname, optimization=optimize if optimize else ""
+        ).replace(os.sep, "/")
+
+        info = tarfile.TarInfo(pyc_name)
+        info.size = len(data)
+        info.mtime = int(st.st_mtime)
+        tar.addfile(info, io.BytesIO(data))
+
+    def _start_nc(self, ssh: "sshcontroller.SshController", nc_ds: bool):
         from netconsole import run  # type: ignore
 
         nc_event = threading.Event()
@@ -641,33 +775,41 @@ class Deploy:
         logger.info("Netconsole is listening...")
         return nc_thread
 
-    def _copy_to_tmpdir(
-        self, tmp_dir: pathlib.Path, project_path: pathlib.Path, dry_run: bool = False
-    ):
-        upload_files = []
-        ignore_exts = frozenset({".pyc", ".whl", ".ipk", ".zip", ".gz", ".wpilog"})
-
-        prefix_len = len(str(project_path)) + 1
-        for root, dirs, files in os.walk(project_path):
-            prefix = root[prefix_len:]
-            if not dry_run:
-                (tmp_dir / prefix).mkdir()
-
-            # skip .svn, .git, .hg, etc directories
-            for d in dirs[:]:
-                if d.startswith(".") or d in ("__pycache__", "venv"):
-                    dirs.remove(d)
-
-            # skip .pyc files
-            for filename in files:
-                r, ext = splitext(filename)
-                if ext in ignore_exts or r.startswith("."):
-                    continue
-
-                fname = join(root, filename)
-                upload_files.append(fname)
-
-                if not dry_run:
-                    shutil.copy(fname, tmp_dir / prefix / filename)
-
-        return upload_files
+    def _iter_upload_files(
+        self, project_path: pathlib.Path
+    ) -> typing.Iterator[typing.Tuple[os.DirEntry, str]]:
+        """
+        Yields (entry, name relative to project_path) for each file and
+        directory in the project that should be uploaded to the robot. A
+        directory is always yielded before its contents. The DirEntry caches
+        its stat result after the first call (only Windows fills it in during
+        the scan), so checking the size doesn't stat the file again.
+        """
+        stack = [(str(project_path), "")]
+        while stack:
+            root, prefix = stack.pop()
+            with os.scandir(root) as it:
+                for entry in it:
+                    name = entry.name
+
+                    if entry.is_dir():
+                        # skip .svn, .git, .hg, etc directories, and don't
+                        # follow symlinks (same as os.walk)
+                        if not (
+                            name.startswith(".")
+                            or name in ("__pycache__", "venv")
+                            or entry.is_symlink()
+                        ):
+                            arcname = join(prefix, name)
+                            yield entry, arcname
+                            stack.append((entry.path, arcname))
+                        continue
+
+                    # skip hidden files and .pyc files
+                    if name[:1] == ".":
+                        continue
+                    dot = name.rfind(".")
+                    if dot > 0 and name[dot:] in _IGNORE_EXTS:
+                        continue
+
+                    yield entry, join(prefix, name)
@@ -1,12 +1,10 @@
 import argparse
-
+import os
 import pathlib
 import json
 import sys
 import typing
 
-from . import sshcontroller
-
 from .utils import handle_cli_error
 from .utils import print_err
 
@@ -34,6 +32,14 @@ class DeployInfo:
             help="If specified, don't do a DNS lookup, allow ssh et al to do it instead",
         )
 
+        parser.add_argument(
+            "--raw",
+            action="store_true",
+            default=None,
+            help="Output deploy.json as stored on the robot instead of reformatting it "
+            "(default when output is not a terminal)",
+        )
+
     @handle_cli_error
     def run(
         self,
@@ -42,8 +48,11 @@ class DeployInfo:
         robot: typing.Optional[str],
         team: typing.Optional[int],
         no_resolve: bool,
+        raw: typing.Optional[bool],
     ):
-        if not main_file.exists():
+        from . import sshcontroller
+
+        if not os.path.isfile(main_file):
             print(
                 f"ERROR: is this a robot project? {main_file} does not exist",
                 file=sys.stderr,
@@ -58,18 +67,21 @@ class DeployInfo:
             robot_or_team=robot or team,
             no_resolve=no_resolve,
         ) as ssh:
-            result = ssh.exec_cmd(
-                (
-                    "[ -f /home/lvuser/py/deploy.json ] && "
-                    "cat /home/lvuser/py/deploy.json || "
-                    "echo {}"
-                ),
-                get_output=True,
-            )
-            if not result.stdout:
+            content = ssh.get_file_bytes("/home/lvuser/py/deploy.json")
+
+            if raw is None:
+                raw = not sys.stdout.isatty()
+
+            if not content:
                 print("{}")
+            elif raw:
+                sys.stdout.flush()
+                sys.stdout.buffer.write(content)
+                if not content.endswith(b"\n"):
+                    sys.stdout.buffer.write(b"\n")
+                sys.stdout.buffer.flush()
             else:
-                data = json.loads(result.stdout)
+                data = json.loads(content)
                 print(json.dumps(data, indent=2, sort_keys=True))
 
         return 0
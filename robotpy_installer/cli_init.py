@@ -3,7 +3,6 @@ import inspect
 import logging
 import pathlib
 
-from . import pyproject
 from .utils import handle_cli_error
 
 
@@ -20,6 +19,9 @@ class Init:
 
     @handle_cli_error
     def run(self, main_file: pathlib.Path, project_path: pathlib.Path):
+        # imported here as all robotpy commands are loaded at startup
+        from . import pyproject
+
         project_path.mkdir(parents=True, exist_ok=True)
 
         # Create robot.py if it doesn't already exist
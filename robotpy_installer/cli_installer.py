@@ -1,18 +1,17 @@
 import argparse
 import pathlib
 import shutil
+import sys
 import typing
 
-from . import pypackages, roborio_utils
 from .utils import handle_cli_error
-
-from .installer import (
-    InstallerException,
-    RobotpyInstaller,
-    _IS_BETA,
-)
 from .utils import yesno
 
+# the installer (and paramiko) is only imported when a command is actually
+# run, as all robotpy commands are loaded at startup
+if typing.TYPE_CHECKING:
+    from .installer import RobotpyInstaller
+
 
 def _add_ssh_options(parser: argparse.ArgumentParser):
     parser.add_argument(
@@ -42,6 +41,8 @@ class _BasicInstallerCmd:
         ignore_image_version: bool,
         robot: typing.Optional[str],
     ):
+        from .installer import RobotpyInstaller
+
         installer = RobotpyInstaller()
         with installer.connect_to_robot(
             project_path=project_path,
@@ -52,7 +53,7 @@ class _BasicInstallerCmd:
         ):
             self.on_run(installer)
 
-    def on_run(self, installer: RobotpyInstaller):
+    def on_run(self, installer: "RobotpyInstaller"):
         raise NotImplementedError()
 
 
@@ -69,8 +70,9 @@ class InstallerCacheLocation:
 
     @handle_cli_error
     def run(self):
-        installer = RobotpyInstaller(log_startup=False)
-        print(installer.cache_root)
+        from .installer import get_cache_root
+
+        print(get_cache_root())
 
 
 class InstallerCacheList:
@@ -81,11 +83,15 @@ class InstallerCacheList:
 
     @handle_cli_error
     def run(self):
-        installer = RobotpyInstaller(log_startup=False)
-        packages = pypackages.get_pip_cache_packages(installer.cache_root)
-        for pkg in sorted(packages.keys()):
-            versions = map(str, sorted(packages[pkg]))
-            print(f"{pkg}: {' '.join(versions)}")
+        from . import pypackages
+        from .installer import get_cache_root
+
+        packages = pypackages.get_pip_cache_packages(get_cache_root())
+        lines = [
+            f"{pkg}: {' '.join(map(str, sorted(versions)))}\n"
+            for pkg, versions in sorted(packages.items())
+        ]
+        sys.stdout.write("".join(lines))
 
 
 class InstallerCacheRm:
@@ -102,9 +108,11 @@ class InstallerCacheRm:
 
     @handle_cli_error
     def run(self, force: bool):
-        installer = RobotpyInstaller(log_startup=False)
-        if force or yesno(f"Really delete {installer.cache_root}?"):
-            shutil.rmtree(installer.cache_root)
+        from .installer import get_cache_root
+
+        cache_root = get_cache_root()
+        if force or yesno(f"Really delete {cache_root}?"):
+            shutil.rmtree(cache_root)
 
 
 class InstallerCache:
@@ -140,6 +148,8 @@ class InstallerDownloadPython:
         )
 
     def run(self, use_certifi: bool):
+        from .installer import RobotpyInstaller
+
         installer = RobotpyInstaller()
         installer.download_python(use_certifi)
 
@@ -149,7 +159,7 @@ class InstallerInstallPython(_BasicInstallerCmd):
     Installs Python on a RoboRIO
     """
 
-    def on_run(self, installer: RobotpyInstaller):
+    def on_run(self, installer: "RobotpyInstaller"):
         installer.install_python()
 
 
@@ -158,7 +168,7 @@ class InstallerUninstallPython(_BasicInstallerCmd):
     Uninstall Python from a RoboRIO
     """
 
-    def on_run(self, installer: RobotpyInstaller):
+    def on_run(self, installer: "RobotpyInstaller"):
         installer.uninstall_python()
 
 
@@ -185,6 +195,8 @@ class InstallerUninstallRobotPy:
         ):
             return
 
+        from .installer import RobotpyInstaller
+
         installer = RobotpyInstaller()
         with installer.connect_to_robot(
             project_path=project_path,
@@ -200,9 +212,10 @@ class InstallerUninstallJavaCpp(_BasicInstallerCmd):
     Uninstall FRC Java/C++ programs from a RoboRIO
     """
 
-    def on_run(self, installer: RobotpyInstaller):
-        if not roborio_utils.uninstall_cpp_java_lvuser(installer.ssh):
-            roborio_utils.uninstall_cpp_java_admin(installer.ssh)
+    def on_run(self, installer: "RobotpyInstaller"):
+        from . import roborio_utils
+
+        roborio_utils.uninstall_cpp_java(installer.ssh)
 
 
 #
@@ -220,11 +233,13 @@ def common_pip_options(
         help="Don't install package dependencies",
     )
 
+    # default is None so that the installer doesn't have to be imported
+    # here, see _resolve_pre
     parser.add_argument(
         "--pre",
         action="store_true",
-        default=_IS_BETA,
-        help="Include pre-release and development versions",
+        default=None,
+        help="Include pre-release and development versions (default for beta releases)",
     )
 
     parser.add_argument(
@@ -243,6 +258,14 @@ def common_pip_options(
     )
 
 
+def _resolve_pre(pre: typing.Optional[bool]) -> bool:
+    if pre is None:
+        from .installer import _IS_BETA
+
+        return _IS_BETA
+    return pre
+
+
 class InstallerDownload:
     """
     Specify Python package(s) to download, and store them in the cache.
@@ -257,12 +280,14 @@ class InstallerDownload:
     def run(
         self,
         no_deps: bool,
-        pre: bool,
+        pre: typing.Optional[bool],
         requirements: typing.Tuple[pathlib.Path],
         packages: typing.Tuple[str],
     ):
+        from .installer import RobotpyInstaller
+
         installer = RobotpyInstaller()
-        installer.pip_download(no_deps, pre, requirements, packages)
+        installer.pip_download(no_deps, _resolve_pre(pre), requirements, packages)
 
 
 class InstallerInstall:
@@ -301,10 +326,12 @@ class InstallerInstall:
         force_reinstall: bool,
         ignore_installed: bool,
         no_deps: bool,
-        pre: bool,
+        pre: typing.Optional[bool],
         requirements: typing.Tuple[pathlib.Path],
         packages: typing.Tuple[str],
     ):
+        from .installer import InstallerException, RobotpyInstaller
+
         if len(requirements) == 0 and len(packages) == 0:
             raise InstallerException(
                 "You must give at least one requirement to install"
@@ -318,7 +345,12 @@ class InstallerInstall:
             ignore_image_version=ignore_image_version,
         ):
             installer.pip_install(
-                force_reinstall, ignore_installed, no_deps, pre, requirements, packages
+                force_reinstall,
+                ignore_installed,
+                no_deps,
+                _resolve_pre(pre),
+                requirements,
+                packages,
             )
 
 
@@ -327,7 +359,7 @@ class InstallerNiWebEnable(_BasicInstallerCmd):
     Enables the NI web server and starts it
     """
 
-    def on_run(self, installer: RobotpyInstaller):
+    def on_run(self, installer: "RobotpyInstaller"):
         installer.ssh.exec_bash(
             "update-rc.d -f systemWebServer defaults",
             "/etc/init.d/systemWebServer start",
@@ -341,7 +373,7 @@ class InstallerNiWebDisable(_BasicInstallerCmd):
     Stops the NI web server and disables it from starting
     """
 
-    def on_run(self, installer: RobotpyInstaller):
+    def on_run(self, installer: "RobotpyInstaller"):
         installer.ssh.exec_bash(
             "/etc/init.d/systemWebServer stop",
             "update-rc.d -f systemWebServer remove",
@@ -371,7 +403,7 @@ class InstallerList(_BasicInstallerCmd):
 
     log_usage = False
 
-    def on_run(self, installer: RobotpyInstaller):
+    def on_run(self, installer: "RobotpyInstaller"):
         installer.pip_list()
 
 
@@ -398,6 +430,8 @@ class InstallerUninstall:
         robot: typing.Optional[str],
         packages: typing.List[str],
     ):
+        from .installer import RobotpyInstaller
+
         installer = RobotpyInstaller()
         with installer.connect_to_robot(
             project_path=project_path,
@@ -408,6 +442,121 @@ class InstallerUninstall:
             installer.pip_uninstall(packages)
 
 
+#
+# Batched operations
+#
+
+
+def _do_install_python(installer: "RobotpyInstaller", packages: typing.List[str]):
+    installer.install_python()
+
+
+def _do_uninstall_python(installer: "RobotpyInstaller", packages: typing.List[str]):
+    installer.uninstall_python()
+
+
+def _do_install(installer: "RobotpyInstaller", packages: typing.List[str]):
+    installer.pip_install(False, False, False, _resolve_pre(None), [], packages)
+
+
+def _do_list(installer: "RobotpyInstaller", packages: typing.List[str]):
+    installer.pip_list()
+
+
+def _do_uninstall(installer: "RobotpyInstaller", packages: typing.List[str]):
+    installer.pip_uninstall(packages)
+
+
+# name: (function, takes packages)
+_do_ops = {
+    "install-python": (_do_install_python, False),
+    "uninstall-python": (_do_uninstall_python, False),
+    "install": (_do_install, True),
+    "list": (_do_list, False),
+    "uninstall": (_do_uninstall, True),
+}
+
+
+def _parse_do_ops(
+    ops: typing.Sequence[str],
+) -> typing.List[typing.Tuple[typing.Callable, typing.List[str]]]:
+    """
+    Converts 'installer do' operations into a list of (function, packages).
+    Consecutive operations on packages are merged, so that pip is only run
+    once for them.
+    """
+    from .installer import InstallerException
+
+    todo: typing.List[typing.Tuple[typing.Callable, typing.List[str]]] = []
+    for op in ops:
+        name, sep, pkg = op.partition(":")
+        try:
+            fn, takes_packages = _do_ops[name]
+        except KeyError:
+            raise InstallerException(f"unknown operation '{name}'") from None
+
+        if not takes_packages:
+            if sep:
+                raise InstallerException(f"'{name}' does not accept packages")
+            todo.append((fn, []))
+        elif not pkg:
+            raise InstallerException(f"'{name}' requires a package ({name}:pkg)")
+        elif todo and todo[-1][0] is fn:
+            todo[-1][1].append(pkg)
+        else:
+            todo.append((fn, [pkg]))
+
+    return todo
+
+
+class InstallerDo:
+    """
+    Runs several installer operations in order using a single connection
+    to the RoboRIO
+
+    Operations that take a package are given the package after a colon,
+    and are repeated for each package. For example:
+
+        robotpy installer do install-python install:numpy install:pyyaml list
+
+    Packages must already have been downloaded with the 'download' command
+    first.
+    """
+
+    def __init__(self, parser: argparse.ArgumentParser) -> None:
+        _add_ssh_options(parser)
+
+        parser.add_argument(
+            "ops",
+            nargs="+",
+            help=f"Operations to run: {', '.join(_do_ops)}",
+        )
+
+    @handle_cli_error
+    def run(
+        self,
+        project_path: pathlib.Path,
+        main_file: pathlib.Path,
+        ignore_image_version: bool,
+        robot: typing.Optional[str],
+        ops: typing.List[str],
+    ):
+        from .installer import RobotpyInstaller
+
+        # validate everything before connecting to the robot
+        todo = _parse_do_ops(ops)
+
+        installer = RobotpyInstaller()
+        with installer.connect_to_robot(
+            project_path=project_path,
+            main_file=main_file,
+            robot_or_team=robot,
+            ignore_image_version=ignore_image_version,
+        ):
+            for fn, packages in todo:
+                fn(installer, packages)
+
+
 #
 # Installer command
 #
@@ -420,6 +569,7 @@ class Installer:
 
     subcommands = [
         ("cache", InstallerCache),
+        ("do", InstallerDo),
         ("download", InstallerDownload),
         ("download-python", InstallerDownloadPython),
         ("install", InstallerInstall),
@@ -4,10 +4,6 @@ import logging
 import pathlib
 import typing
 
-
-from .installer import RobotpyInstaller
-from . import pyproject
-
 logger = logging.getLogger("project")
 
 
@@ -25,6 +21,10 @@ class UpdateRobotpy:
         )
 
     def run(self, project_path: pathlib.Path, use_certifi: bool) -> bool:
+        # imported here as all robotpy commands are loaded at startup
+        from . import pyproject
+        from .installer import RobotpyInstaller
+
         try:
             project = pyproject.load(project_path)
         except FileNotFoundError:
@@ -1,21 +1,22 @@
 import argparse
-import inspect
+import concurrent.futures
 import logging
 import os
 import pathlib
 import subprocess
 import sys
-import tempfile
-
-from packaging.version import Version
 
 from .utils import handle_cli_error, yesno
 
+logger = logging.getLogger("sync")
 
-from .installer import RobotpyInstaller
-from . import pyproject
 
-logger = logging.getLogger("sync")
+def _cmd_quote(arg: str) -> str:
+    # Quote everything so that cmd doesn't interpret requirement specifiers
+    # such as '<' or '>' as redirection. Double quotes can't be escaped for
+    # cmd, but they only occur in requirement markers where PEP 508 allows
+    # single quotes instead
+    return '"' + arg.replace('"', "'") + '"'
 
 
 class Sync:
@@ -84,13 +85,19 @@ class Sync:
         user: bool,
         use_certifi: bool,
     ):
-        if not main_file.exists():
+        if not os.path.isfile(main_file):
             print(
                 f"ERROR: is this a robot project? {main_file} does not exist",
                 file=sys.stderr,
             )
             return 1
 
+        # imported here as all robotpy commands are loaded at startup
+        from packaging.version import Version
+
+        from . import pyproject
+        from .installer import RobotpyInstaller
+
         installer = RobotpyInstaller()
 
         # parse pyproject.toml to determine the requirements
@@ -140,16 +147,28 @@ class Sync:
         # First, download requirements for RoboRIO
         #
 
-        logger.info("Downloading Python for RoboRIO")
-        installer.download_python(use_certifi)
+        # Python and the packages come from different servers and don't
+        # depend on each other, so download python in the background (without
+        # a progress indicator, as it would be mixed up with pip's output)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+            logger.info("Downloading Python for RoboRIO")
+            python_future = executor.submit(
+                installer.download_python, use_certifi, False
+            )
 
-        logger.info("Downloading RoboRIO python packages")
-        installer.pip_download(
-            no_deps=False,
-            pre=False,
-            requirements=[],
-            packages=packages,
-        )
+            # Always hand the full set of packages to a single pip invocation
+            # (here and for the local install below) -- each pip run pays for
+            # interpreter startup and resolver setup, and pip can only resolve
+            # the requirements consistently if it sees all of them at once
+            logger.info("Downloading RoboRIO python packages")
+            installer.pip_download(
+                no_deps=False,
+                pre=False,
+                requirements=[],
+                packages=packages,
+            )
+
+            python_future.result()
 
         #
         # Local requirement installation
@@ -174,20 +193,13 @@ class Sync:
             if sys.platform != "win32":
                 os.execv(sys.executable, pip_args)
 
-            with tempfile.NamedTemporaryFile("w", delete=False, suffix=".py") as fp:
-                fp.write(
-                    inspect.cleandoc(
-                        f"""
-                        import os, subprocess
-                        subprocess.run({pip_args!r})
-                        print()
-                        input("Install complete, press enter to continue")
-                        os.unlink(__file__)
-                    """
-                    )
-                )
+            # Run pip directly in a new console window, and keep the window
+            # open when it's done so the user can see the result. cmd strips
+            # the outer quotes, leaving the quoted pip command line intact
+            cmdline = " ".join(map(_cmd_quote, pip_args))
 
             print("pip is launching in a new window to complete the installation")
             subprocess.Popen(
-                [sys.executable, fp.name], creationflags=subprocess.CREATE_NEW_CONSOLE
+                f'cmd /c "{cmdline} & echo. & echo Install complete & pause"',
+                creationflags=subprocess.CREATE_NEW_CONSOLE,
             )
@@ -4,9 +4,9 @@ import sys
 import typing
 
 
-from os.path import abspath, dirname, join
+from os.path import abspath, dirname, isfile, join
 
-from . import sshcontroller
+from .errors import SshExecError
 from .utils import print_err, yesno
 
 
@@ -49,7 +49,7 @@ class Undeploy:
         no_resolve: bool,
         yes: bool,
     ):
-        if not main_file.exists():
+        if not isfile(main_file):
             print(
                 f"ERROR: is this a robot project? {main_file} does not exist",
                 file=sys.stderr,
@@ -62,6 +62,9 @@ class Undeploy:
             ):
                 return 1
 
+        # imported here as all robotpy commands are loaded at startup
+        from . import sshcontroller
+
         try:
             with sshcontroller.ssh_from_cfg(
                 project_path,
@@ -71,18 +74,17 @@ class Undeploy:
                 robot_or_team=robot or team,
                 no_resolve=no_resolve,
             ) as ssh:
-                # first, turn off the running program
-                ssh.exec_cmd("/usr/local/frc/bin/frcKillRobot.sh -t")
-
-                # delete the code
-                ssh.exec_cmd("rm -rf /home/lvuser/py")
-
-                # for good measure, delete the start command too
-                ssh.exec_cmd(
-                    "rm -f /home/lvuser/robotDebugCommand /home/lvuser/robotCommand"
+                ssh.exec_bash(
+                    # first, turn off the running program
+                    "/usr/local/frc/bin/frcKillRobot.sh -t || true",
+                    # delete the code
+                    "rm -rf /home/lvuser/py",
+                    # for good measure, delete the start command too
+                    "rm -f /home/lvuser/robotDebugCommand /home/lvuser/robotCommand",
+                    check=True,
                 )
 
-        except sshcontroller.SshExecError as e:
+        except SshExecError as e:
             print_err("ERROR:", str(e))
             return 1
 
@@ -3,11 +3,13 @@ import inspect
 import io
 import json
 import logging
+import os
 import pathlib
 import re
 import shlex
 import subprocess
 import sys
+import time
 from urllib.parse import urlparse
 import typing
 
@@ -37,12 +39,58 @@ _ROBORIO2_IMAGES = [
     "2025_v1.1",
 ]
 
+_ROBORIO_IMAGE_RE = re.compile(r'IMAGEVERSION = "(FRC_)?roboRIO_(.*)"')
+_ROBORIO2_IMAGE_RE = re.compile(r'IMAGEVERSION = "(FRC_)?roboRIO2_(.*)"')
+
+# Commands that retrieve information about the RoboRIO. These are usually
+# run together by _get_robot_status, with each command's output following
+# a line that starts with _STATUS_PREFIX
+_STATUS_CMDS = {
+    "image": "grep IMAGEVERSION /etc/natinst/share/scs_imagemetadata.ini",
+    "df": "df -h / | tail -n 1",
+    "meminfo": "cat /proc/meminfo",
+}
+
+_STATUS_PREFIX = "robotpy-status:"
+
 _ROBOTPY_PYTHON_PLATFORM = "linux_roborio"
 _ROBOTPY_PYTHON_VERSION_NUM = "313"
 _ROBOTPY_PYTHON_VERSION = f"python{_ROBOTPY_PYTHON_VERSION_NUM}"
 
 _PIP_STUB_PATH = "/home/admin/rpip"
 
+# How long (in seconds) package information retrieved from pypi is used
+# before checking pypi again
+_PYPI_CACHE_TTL = 3600
+
+# Pieces of the script used by opkg_install
+# -> opkg list-installed is only run once, each package is checked against
+#    its saved output
+_OPKG_SCRIPT_START = """\
+set -e
+PACKAGES=()
+DO_INSTALL=0
+INSTALLED="$(opkg list-installed)\""""
+
+_OPKG_SCRIPT_PKG = """\
+if ! grep -F "%(name)s - %(version)s" <<< "${INSTALLED}"; then
+    PACKAGES+=("http://localhost:%(port)s/opkg_cache/%(fname)s")
+    DO_INSTALL=1
+else
+    echo "%(name)s already installed"
+fi"""
+
+_OPKG_SCRIPT_END = """\
+if [ "${DO_INSTALL}" == "0" ]; then
+    echo "No packages to install."
+else
+    echo + opkg install %(options)s ${PACKAGES[@]}
+    opkg install %(options)s ${PACKAGES[@]}
+fi
+
+sync
+ldconfig"""
+
 _PYTHON_IPK = "https://github.com/robotpy/roborio-python/releases/download/2025-3.13.1-r1/python313_3.13.1-r1_cortexa9-vfpv3.ipk"
 
 logger = logging.getLogger("robotpy.installer")
@@ -68,9 +116,16 @@ def catch_ssh_error(msg: str):
         raise InstallerException(f"{msg}: {e}")
 
 
+def get_cache_root() -> pathlib.Path:
+    """
+    Location of the installer cache
+    """
+    return pathlib.Path.home() / "wpilib" / _WPILIB_YEAR / "robotpy"
+
+
 class RobotpyInstaller:
     def __init__(self, *, log_startup: bool = True):
-        self.cache_root = pathlib.Path.home() / "wpilib" / _WPILIB_YEAR / "robotpy"
+        self.cache_root = get_cache_root()
         self.pip_cache = self.cache_root / "pip_cache"
         self.opkg_cache = self.cache_root / "opkg_cache"
 
@@ -114,24 +169,42 @@ class RobotpyInstaller:
         with ssh:
             self._ssh = ssh
 
-            self.ensure_image_version(ignore_image_version)
-
+            # Retrieve everything we need to know in a single command
+            names = []
+            if not self._image_version_ok:
+                names.append("image")
             if log_usage:
-                self.show_disk_space()
-                self.show_mem_usage()
+                names += ["df", "meminfo"]
 
-            yield
+            status = self._get_robot_status(*names)
 
-            if self._webserver_needs_start:
-                self.ssh.exec_cmd("/etc/init.d/systemWebServer start")
-                self._webserver_needs_start = False
-                self._webserver_stopped = False
+            if not self._image_version_ok:
+                self.ensure_image_version(ignore_image_version, status["image"])
 
             if log_usage:
-                self.show_disk_space()
-                self.show_mem_usage()
-
-            self._ssh = None
+                self.show_disk_space(status["df"])
+                self.show_mem_usage(status["meminfo"])
+
+            try:
+                yield
+
+                if self._webserver_needs_start:
+                    self.ssh.exec_cmd("/etc/init.d/systemWebServer start")
+                    self._webserver_needs_start = False
+                    self._webserver_stopped = False
+
+                if log_usage:
+                    status = self._get_robot_status("df", "meminfo")
+                    self.show_disk_space(status["df"])
+                    self.show_mem_usage(status["meminfo"])
+            finally:
+                # stop the cache server even if something failed, so its
+                # thread doesn't outlive the connection
+                if self._cache_server is not None:
+                    self._cache_server.close()
+                    self._cache_server = None
+
+                self._ssh = None
 
     @property
     def cache_server(self) -> CacheServer:
@@ -162,6 +235,10 @@ class RobotpyInstaller:
         Installs opkg package on RoboRIO
         """
 
+        # drop duplicates (but keep the order) so each package is only
+        # checked and installed once
+        packages = list(dict.fromkeys(packages))
+
         for package in packages:
             if package.parent != self.opkg_cache:
                 raise ValueError("internal error")
@@ -176,93 +253,103 @@ class RobotpyInstaller:
         #    to only install a package if it's not already installed
         opkg_files = []
 
-        opkg_script = inspect.cleandoc(
-            """
-            set -e
-            PACKAGES=()
-            DO_INSTALL=0
-            """
-        )
-
-        opkg_script_bit = inspect.cleandoc(
-            f"""
-            if ! opkg list-installed | grep -F "%(name)s - %(version)s"; then
-                PACKAGES+=("http://localhost:{self.cache_server.port}/opkg_cache/%(fname)s")
-                DO_INSTALL=1
-            else
-                echo "%(name)s already installed"
-            fi
-            """
-        )
+        script_parts = [_OPKG_SCRIPT_START]
+        port = self.cache_server.port
 
         for package in packages:
             pkgname, pkgversion, _ = package.name.split("_")
 
-            opkg_script += "\n" + (
-                opkg_script_bit
+            script_parts.append(
+                _OPKG_SCRIPT_PKG
                 % {
                     "fname": package.name,
                     "name": pkgname,
                     "version": pkgversion,
+                    "port": port,
                 }
             )
 
             opkg_files.append(package.name)
 
         # Finish it out
-        opkg_script += "\n" + (
-            inspect.cleandoc(
-                """
-                if [ "${DO_INSTALL}" == "0" ]; then
-                    echo "No packages to install."
-                else
-                    echo + opkg install %(options)s ${PACKAGES[@]}
-                    opkg install %(options)s ${PACKAGES[@]}
-                fi
-
-                sync
-                ldconfig
-                """
-            )
+        script_parts.append(
+            _OPKG_SCRIPT_END
             % {"options": "--force-reinstall" if force_reinstall else ""}
         )
 
+        opkg_script = "\n".join(script_parts)
+
+        # Upload the script instead of echoing it through the shell, so it
+        # doesn't need quoting and isn't limited by the command line length
+        # -> write to /tmp so that it doesn't persist
         with catch_ssh_error("creating opkg install script"):
-            # write to /tmp so that it doesn't persist
-            self.ssh.exec_cmd(
-                f"echo '{opkg_script}' > /tmp/install_opkg.sh",
-                check=True,
+            self.ssh.sftp_fp(
+                io.BytesIO(opkg_script.encode("utf-8")), "/tmp/install_opkg.sh"
             )
 
         with catch_ssh_error("installing selected packages"):
             self.ssh.exec_cmd(
-                "bash /tmp/install_opkg.sh", check=True, print_output=True
+                "bash /tmp/install_opkg.sh; rc=$?; rm -f /tmp/install_opkg.sh; exit $rc",
+                check=True,
+                print_output=True,
             )
 
-        try:
-            self.ssh.exec_cmd("rm /tmp/install_opkg.sh")
-        except SshExecError:
-            pass
+    def _get_robot_status(self, *names: str) -> typing.Dict[str, str]:
+        """
+        Runs the _STATUS_CMDS given by names in a single command, and returns
+        the output of each
+        """
+        if not names:
+            return {}
+
+        commands = []
+        for name in names:
+            commands.append(f"echo {_STATUS_PREFIX}{name}")
+            commands.append(_STATUS_CMDS[name])
+
+        # don't stop on errors, a command without output is reported below
+        result = self.ssh.exec_bash(*commands, bash_opts="", get_output=True)
+        assert result.stdout is not None
+
+        output: typing.Dict[str, typing.List[str]] = {name: [] for name in names}
+        current = None
+        for line in result.stdout.splitlines(keepends=True):
+            if line.startswith(_STATUS_PREFIX):
+                current = output.get(line[len(_STATUS_PREFIX) :].strip())
+            elif current is not None:
+                current.append(line)
+
+        status = {}
+        for name, lines in output.items():
+            status[name] = "".join(lines)
+            if not status[name].strip():
+                raise InstallerException(
+                    f"retrieving robot status: no output from '{_STATUS_CMDS[name]}'"
+                )
+
+        return status
 
     def show_disk_space(
-        self,
+        self, result: typing.Optional[str] = None
     ) -> typing.Tuple[str, str, str]:
         #
         # Free space check.. maybe in the future we'll use this to not accidentally
         # fill the user's disk, but it'd be annoying to figure out
         #
 
-        with catch_ssh_error("checking free space"):
-            result = self.ssh.check_output("df -h / | tail -n 1")
+        if result is None:
+            with catch_ssh_error("checking free space"):
+                result = self.ssh.check_output(_STATUS_CMDS["df"])
 
         _, size, used, _, pct, _ = result.strip().split()
         logger.info("-> RoboRIO disk usage %s/%s (%s full)", used, size, pct)
 
         return size, used, pct
 
-    def show_mem_usage(self):
-        with catch_ssh_error("checking memory info"):
-            result = self.ssh.check_output("cat /proc/meminfo")
+    def show_mem_usage(self, result: typing.Optional[str] = None):
+        if result is None:
+            with catch_ssh_error("checking memory info"):
+                result = self.ssh.check_output(_STATUS_CMDS["meminfo"])
 
         total_kb = 0
         available_kb = 0
@@ -302,21 +389,19 @@ class RobotpyInstaller:
 
         self._webserver_stopped = True
 
-    def ensure_image_version(self, ignore_image_version: bool):
+    def ensure_image_version(
+        self, ignore_image_version: bool, result: typing.Optional[str] = None
+    ):
         if self._image_version_ok:
             return
 
-        with catch_ssh_error("retrieving image version"):
-            result = self.ssh.check_output(
-                "grep IMAGEVERSION /etc/natinst/share/scs_imagemetadata.ini",
-            )
+        if result is None:
+            with catch_ssh_error("retrieving image version"):
+                result = self.ssh.check_output(_STATUS_CMDS["image"])
 
-        roborio_match = re.match(
-            r'IMAGEVERSION = "(FRC_)?roboRIO_(.*)"', result.strip()
-        )
-        roborio2_match = re.match(
-            r'IMAGEVERSION = "(FRC_)?roboRIO2_(.*)"', result.strip()
-        )
+        result = result.strip()
+        roborio_match = _ROBORIO_IMAGE_RE.match(result)
+        roborio2_match = _ROBORIO2_IMAGE_RE.match(result)
 
         if roborio_match:
             version = roborio_match.group(2)
@@ -358,13 +443,9 @@ class RobotpyInstaller:
         with catch_ssh_error("checking for pip3"):
             if self.ssh.exec_cmd("[ -x /usr/local/bin/pip3 ]").returncode != 0:
                 raise InstallerException(
-                    inspect.cleandoc(
-                        """
-                        pip3 not found on RoboRIO, did you install python?
-
-                        Use the 'download-python' and 'install-python' commands first!
-                        """
-                    )
+                    "pip3 not found on RoboRIO, did you install python?\n"
+                    "\n"
+                    "Use the 'download-python' and 'install-python' commands first!"
                 )
 
         # Use pip stub to override the wheel platform on roborio
@@ -393,11 +474,13 @@ class RobotpyInstaller:
     def is_python_downloaded(self) -> bool:
         return self._python_ipk_path.exists()
 
-    def download_python(self, use_certifi: bool):
+    def download_python(self, use_certifi: bool, show_status: bool = True):
         self.opkg_cache.mkdir(parents=True, exist_ok=True)
 
         ipk_dst = self._python_ipk_path
-        _urlretrieve(_PYTHON_IPK, ipk_dst, True, _make_ssl_context(use_certifi))
+        _urlretrieve(
+            _PYTHON_IPK, ipk_dst, True, _make_ssl_context(use_certifi), show_status
+        )
 
     def install_python(self):
         """
@@ -642,16 +725,36 @@ class RobotpyInstaller:
         """
         self.cache_root.mkdir(parents=True, exist_ok=True)
         fname = self.cache_root / f"pypi-{package}.json"
-        _urlretrieve(
-            f"https://pypi.org/simple/{package}",
-            fname,
-            True,
-            _make_ssl_context(use_certifi),
-            False,
-            {"Accept": "application/vnd.pypi.simple.v1+json"},
-        )
-        with open(fname, "r") as fp:
-            data = json.load(fp)
+
+        try:
+            fresh = time.time() - fname.stat().st_mtime < _PYPI_CACHE_TTL
+        except FileNotFoundError:
+            fresh = False
+
+        data = None
+        if fresh:
+            try:
+                with open(fname, "r") as fp:
+                    data = json.load(fp)
+            except ValueError:
+                # a truncated or otherwise corrupted download: remove it so
+                # that it is retrieved again in full
+                fname.unlink()
+
+        if data is None:
+            _urlretrieve(
+                f"https://pypi.org/simple/{package}",
+                fname,
+                True,
+                _make_ssl_context(use_certifi),
+                False,
+                {"Accept": "application/vnd.pypi.simple.v1+json"},
+            )
+            # mark as checked, even if pypi said it wasn't modified
+            os.utime(fname)
+
+            with open(fname, "r") as fp:
+                data = json.load(fp)
 
         versions = [Version(v) for v in data["versions"]]
 
@@ -3,6 +3,7 @@ Various python packaging related logic
 """
 
 from importlib.metadata import distributions, metadata, PackageNotFoundError
+import os
 import pathlib
 import typing
 import zipfile
@@ -168,19 +169,29 @@ def get_pip_cache_packages(
 
     packages: Packages = {}
 
-    for f in (cache_root / "pip_cache").iterdir():
-        if f.suffix == ".whl":
-            try:
-                name, version, _, _ = parse_wheel_filename(f.name)
-                packages.setdefault(name, []).append(CacheVersion(str(version), f))
-            except InvalidWheelFilename:
-                pass
-        elif f.suffix in (".gz", ".zip"):
-            try:
-                name, version = parse_sdist_filename(f.name)
-                packages.setdefault(name, []).append(CacheVersion(str(version), f))
-            except InvalidSdistFilename:
-                pass
+    pip_cache = cache_root / "pip_cache"
+
+    # only filenames are needed, so avoid constructing a Path for every
+    # file that isn't a package
+    with os.scandir(pip_cache) as it:
+        for entry in it:
+            fname = entry.name
+            if fname.endswith(".whl"):
+                try:
+                    name, version, _, _ = parse_wheel_filename(fname)
+                except InvalidWheelFilename:
+                    continue
+            elif fname.endswith((".gz", ".zip")):
+                try:
+                    name, version = parse_sdist_filename(fname)
+                except InvalidSdistFilename:
+                    continue
+            else:
+                continue
+
+            packages.setdefault(name, []).append(
+                CacheVersion(str(version), pip_cache / fname)
+            )
 
     return packages
 
@@ -7,7 +7,6 @@ import typing
 from packaging.requirements import Requirement
 from packaging.version import Version, InvalidVersion
 import tomli
-import tomlkit
 
 from . import installer
 from . import pypackages
@@ -108,7 +107,9 @@ class RobotPyProjectToml:
         return [self.robotpy_requires] + self.requires
 
     def get_install_list(self) -> typing.List[str]:
-        return list(map(str, self.get_install_reqs()))
+        # drop duplicate requirements (preserving order) so pip doesn't
+        # process them more than once
+        return list(dict.fromkeys(map(str, self.get_install_reqs())))
 
 
 def robotpy_installed_version() -> str:
@@ -262,6 +263,9 @@ def _load(
 
 
 def set_robotpy_version(project_path: pathlib.Path, version: Version):
+    # only needed when modifying the file
+    import tomlkit
+
     pyproject_path = toml_path(project_path)
     with open(pyproject_path) as fp:
         data = tomlkit.parse(fp.read())
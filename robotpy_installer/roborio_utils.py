@@ -5,6 +5,7 @@ import logging
 import pathlib
 import typing
 
+from .errors import Error
 from .sshcontroller import SshController
 
 logger = logging.getLogger("robotpy.installer")
@@ -22,36 +23,39 @@ kill_robot_cmd = f"{kill_robot_script} -t"
 kill_script_content: typing.Optional[bytes] = None
 
 
-def uninstall_cpp_java_lvuser(ssh: SshController) -> bool:
-    """
-    Frees up disk space by removing FRC C++/Java programs. This runs as lvuser or admin.
+_uninstall_cpp_java_lvuser_cmds = (
+    ". /etc/profile.d/frc-path.sh",
+    ". /etc/profile.d/natinst-path.sh",
+    "set -x",
+    # Kill code only if java jar present
+    f"[ ! -f {java_jars} ] || {kill_robot_cmd}",
+    # Kill code only if cpp exe present
+    f"[ ! -f {cpp_exe} ] || {kill_robot_cmd}",
+    f"rm -rf {' '.join((java_jars, cpp_exe, robot_command))}",
+)
 
-    :returns: True if success, False if uninstall_cpp_java_admin needs to be ran
-    """
+# Runs the lvuser pieces of the C++/Java uninstall, ignoring failures
+_uninstall_cpp_java_lvuser_cmd = (
+    f"( {'; '.join(_uninstall_cpp_java_lvuser_cmds)} ) || true"
+)
 
-    logger.info("Clearing FRC C++/Java user programs if present")
+# All succeed if the admin pieces of the C++/Java uninstall aren't needed
+_cpp_java_admin_checks = (
+    '[ -z "$(opkg list-installed frc*-openjdk-*)" ]',
+    f'[ ! -d {third_party_libs} ] || [ -z "$(ls /usr/local/frc/third-party/lib)" ]',
+    # This is copied with admin privs, can't delete as lvuser
+    f"[ ! -d {static_deploy} ]",
+)
 
-    rm_paths = (java_jars, cpp_exe, robot_command)
+_cpp_java_admin_check = " && ".join(f"{{ {c}; }}" for c in _cpp_java_admin_checks)
 
-    ssh.exec_bash(
-        ". /etc/profile.d/frc-path.sh",
-        ". /etc/profile.d/natinst-path.sh",
-        "set -x",
-        # Kill code only if java jar present
-        f"[ ! -f {java_jars} ] || {kill_robot_cmd}",
-        # Kill code only if cpp exe present
-        f"[ ! -f {cpp_exe} ] || {kill_robot_cmd}",
-        f"rm -rf {' '.join(rm_paths)}",
-    )
 
-    # Check if admin pieces need to run
-    result = ssh.exec_bash(
-        '[ -z "$(opkg list-installed frc*-openjdk-*)" ]',
-        f'[ ! -d {third_party_libs} ] || [ -z "$(ls /usr/local/frc/third-party/lib)" ]',
-        # This is copied with admin privs, can't delete as lvuser
-        f"[ ! -d {static_deploy} ]",
-    )
-    return result.returncode == 0
+_uninstall_cpp_java_admin_cmds = (
+    # Remove java ipk
+    'opkg remove "frc*-openjdk*"',
+    # Remove third party libs not used by RobotPy
+    f"rm -rf {third_party_libs} {static_deploy}",
+)
 
 
 def uninstall_cpp_java_admin(ssh: SshController):
@@ -61,28 +65,117 @@ def uninstall_cpp_java_admin(ssh: SshController):
 
     logger.info("Clearing FRC C++/Java program support")
 
-    rm_paths = (third_party_libs, static_deploy)
-
     ssh.exec_bash(
-        # Remove java ipk
-        'opkg remove "frc*-openjdk*"',
-        # Remove third party libs not used by RobotPy
-        f"rm -rf {' '.join(rm_paths)}",
+        *_uninstall_cpp_java_admin_cmds,
         bash_opts="ex",
         print_output=True,
         check=True,
     )
 
 
-def get_rio_py_packages(ssh: SshController) -> typing.Dict[str, str]:
-    # Use importlib.metadata instead of pip because it's way faster than pip
-    result = ssh.exec_cmd(
-        "/usr/local/bin/python3 -c "
-        "'from importlib.metadata import distributions;"
-        "import json; import sys; "
-        "json.dump({dist.name: dist.version for dist in distributions()},sys.stdout)'",
-        get_output=True,
+def uninstall_cpp_java(ssh: SshController):
+    """
+    Frees up disk space by removing FRC C++/Java programs, and then does
+    uninstall_cpp_java_admin if it is needed, in a single command. Fails if
+    not ran as admin.
+    """
+
+    logger.info("Clearing FRC C++/Java programs if present")
+
+    ssh.exec_bash(
+        _uninstall_cpp_java_lvuser_cmd,
+        f"if ! {{ {_cpp_java_admin_check}; }}; then "
+        f"set -x; {'; '.join(_uninstall_cpp_java_admin_cmds)}; fi",
+        print_output=True,
+        check=True,
     )
+
+
+class DeployState(typing.NamedTuple):
+    #: frcKillRobot.sh matches the one shipped with the installer
+    kill_script_updated: bool
+
+    #: uninstall_cpp_java_admin needs to be ran
+    cpp_java_exists: bool
+
+    #: python is installed
+    python_exists: bool
+
+    #: installed python packages (only if requested and python is installed)
+    py_packages: typing.Optional[typing.Dict[str, str]] = None
+
+
+_probe_prefix = "robotpy-probe:"
+
+# Use importlib.metadata instead of pip because it's way faster than pip
+_rio_py_packages_cmd = (
+    "/usr/local/bin/python3 -c "
+    "'from importlib.metadata import distributions;"
+    "import json; import sys; "
+    "json.dump({dist.name: dist.version for dist in distributions()},sys.stdout)'"
+)
+
+
+def probe_deploy_state(
+    ssh: SshController, get_py_packages: bool = False
+) -> DeployState:
+    """
+    Does everything that deploy needs to know about the robot before
+    installing anything in a single command. This also removes FRC C++/Java
+    user programs (but not the pieces that uninstall_cpp_java_admin removes).
+
+    :param get_py_packages: Also retrieve the installed python packages, as
+                            get_rio_py_packages would
+    """
+
+    logger.info("Clearing FRC C++/Java user programs if present")
+
+    commands = [
+        _uninstall_cpp_java_lvuser_cmd,
+        f'echo "{_probe_prefix}kill_md5=$(md5sum {kill_robot_script} 2>/dev/null)"',
+        f"if {_cpp_java_admin_check}; then "
+        f"echo {_probe_prefix}cpp_java=0; else echo {_probe_prefix}cpp_java=1; fi",
+        "if [ -x /usr/local/bin/python3 ]; then "
+        f"echo {_probe_prefix}python=1; else echo {_probe_prefix}python=0; fi",
+    ]
+    if get_py_packages:
+        commands.append(
+            "if [ -x /usr/local/bin/python3 ]; then "
+            f'echo "{_probe_prefix}packages=$({_rio_py_packages_cmd})"; fi'
+        )
+
+    result = ssh.exec_bash(*commands, check=True, get_output=True)
+    assert result.stdout is not None
+
+    state: typing.Dict[str, str] = {}
+    for line in result.stdout.splitlines():
+        if line.startswith(_probe_prefix):
+            key, _, value = line[len(_probe_prefix) :].partition("=")
+            state[key] = value.strip()
+
+    # If the package listing failed for some reason, the caller can still
+    # fall back to get_rio_py_packages
+    py_packages = None
+    if state.get("packages"):
+        try:
+            py_packages = json.loads(state["packages"])
+        except ValueError:
+            pass
+
+    try:
+        ks_hash = hashlib.md5(get_kill_script()).hexdigest()
+        return DeployState(
+            kill_script_updated=state["kill_md5"].split(" ", 1)[0] == ks_hash,
+            cpp_java_exists=state["cpp_java"] == "1",
+            python_exists=state["python"] == "1",
+            py_packages=py_packages,
+        )
+    except KeyError:
+        raise Error(f"unexpected output when checking robot: {result.stdout}")
+
+
+def get_rio_py_packages(ssh: SshController) -> typing.Dict[str, str]:
+    result = ssh.exec_cmd(_rio_py_packages_cmd, get_output=True)
     assert result.stdout is not None
     return json.loads(result.stdout)
 
@@ -96,13 +189,6 @@ def get_kill_script() -> bytes:
     return kill_script_content
 
 
-def check_kill_script(ssh: SshController) -> bool:
-    ks: bytes = get_kill_script()
-    ks_hash = hashlib.md5(ks).hexdigest()
-    output = ssh.check_output(f"md5sum {kill_robot_script}")
-    return output.split(" ", 1)[0] == ks_hash
-
-
 def update_kill_script(ssh: SshController):
     logger.info("Updating %s", kill_robot_script)
     fp = io.BytesIO(get_kill_script())
@@ -1,12 +1,14 @@
+import contextlib
 import io
 import logging
 import re
 import os
-from os.path import exists, join, expanduser, split as splitpath
-from pathlib import Path, PurePath, PurePosixPath
+from os.path import exists, join, expanduser
+from pathlib import Path
 import shlex
 import socket
 import sys
+import tarfile
 import typing
 
 
@@ -57,6 +59,9 @@ class SshController:
         self.client = paramiko.SSHClient()
         self.client.set_missing_host_key_policy(SuppressKeyPolicy)
 
+        self._transport: typing.Optional[paramiko.Transport] = None
+        self._sftp_client: typing.Optional[paramiko.SFTPClient] = None
+
     def __enter__(self):
         self.client.connect(
             self.hostname,
@@ -66,11 +71,38 @@ class SshController:
             look_for_keys=False,
             sock=self.conn,
         )
+        self._transport = self.client.get_transport()
         return self
 
     def __exit__(self, *args):
+        if self._sftp_client is not None:
+            self._sftp_client.close()
+            self._sftp_client = None
+        self._transport = None
         self.client.close()
 
+    @property
+    def transport(self) -> paramiko.Transport:
+        """
+        The connection to the robot, all channels are multiplexed over it.
+        Only access inside the context manager.
+        """
+        if self._transport is None:
+            raise RuntimeError("not connected")
+        return self._transport
+
+    @property
+    def sftp_client(self) -> paramiko.SFTPClient:
+        """
+        SFTP session that is opened on first use and shared by all SFTP
+        operations on this connection
+        """
+        if self._sftp_client is None:
+            sftp_client = paramiko.SFTPClient.from_transport(self.transport)
+            assert sftp_client is not None
+            self._sftp_client = sftp_client
+        return self._sftp_client
+
     def exec_cmd(
         self,
         cmd: str,
@@ -82,10 +114,7 @@ class SshController:
         output = None
         buffer = io.StringIO()
 
-        transport = self.client.get_transport()
-        assert transport is not None
-
-        with transport.open_session() as channel:
+        with self.transport.open_session() as channel:
             channel.set_combine_stderr(True)
             channel.exec_command(cmd)
 
@@ -148,41 +177,68 @@ class SshController:
         assert result.stdout is not None
         return result.stdout
 
-    def sftp(self, local_path, remote_path, mkdir=True):
-        # from https://gist.github.com/johnfink8/2190472
-        oldcwd = os.getcwd()
-        sftp = self.client.open_sftp()
-        try:
-            remote_path = PurePosixPath(remote_path)
-            parent, child = splitpath(local_path)
-            os.chdir(parent)
-            for d, _, files in os.walk(child):
-                d = PurePath(d)
-                try:
-                    remote_dir = remote_path / d
-                    print("make", remote_dir)
-                    if not mkdir:
-                        # skip first mkdir
-                        mkdir = True
-                    else:
-                        sftp.mkdir(str(remote_dir))
-                except:
+    @contextlib.contextmanager
+    def tar_upload(self, remote_path: str) -> typing.Iterator[tarfile.TarFile]:
+        """
+        Streams a tar archive to the robot over a single channel, where it is
+        extracted into remote_path. Anything added to the yielded TarFile is
+        uploaded. Symlinks are followed, so the files they point to are
+        uploaded instead of links that may not resolve on the robot.
+        """
+
+        qpath = shlex.quote(remote_path)
+        cmd = f"mkdir -p {qpath} && tar -C {qpath} -xf -"
+
+        with self.transport.open_session() as channel:
+            channel.set_combine_stderr(True)
+            channel.exec_command(cmd)
+
+            write_error = None
+            try:
+                with channel.makefile("wb") as stdin:
+                    with tarfile.open(
+                        fileobj=stdin,
+                        mode="w|",
+                        format=tarfile.GNU_FORMAT,
+                        dereference=True,
+                    ) as tar:
+                        yield tar
+
+                channel.shutdown_write()
+            except OSError as e:
+                # writes fail once the remote command exits early, such as
+                # when mkdir or tar fails. Its output says why
+                if not channel.exit_status_ready():
                     raise
-                for fname in files:
-                    local_fname = d / fname
-                    remote_fname = remote_dir / fname
-                    print(local_fname.relative_to(child), "->", remote_fname)
-                    sftp.put(str(local_fname), str(remote_fname))
-        finally:
-            os.chdir(oldcwd)
-            sftp.close()
+                write_error = e
 
-    def sftp_fp(self, fp, remote_path):
-        sftp = self.client.open_sftp()
+            with channel.makefile("rb") as stdout:
+                output = stdout.read().decode("utf-8", "backslashreplace")
+
+            retval = channel.recv_exit_status()
+
+        if retval != 0:
+            raise SshExecError(
+                "Command '%s' returned non-zero error status %s\n%s"
+                % (cmd, retval, output),
+                retval,
+            ) from write_error
+        elif write_error is not None:
+            raise write_error
+
+    def get_file_bytes(self, remote_path: str) -> typing.Optional[bytes]:
+        """
+        Reads a file from the robot without running any commands. Returns
+        None if the file does not exist
+        """
         try:
-            sftp.putfo(fp, remote_path)
-        finally:
-            sftp.close()
+            with self.sftp_client.open(remote_path, "rb") as fp:
+                return fp.read()
+        except FileNotFoundError:
+            return None
+
+    def sftp_fp(self, fp, remote_path):
+        self.sftp_client.putfo(fp, remote_path)
 
 
 def ssh_from_cfg(
@@ -221,7 +277,7 @@ def ssh_from_cfg(
 
     if dirty:
         # Only write preferences file if this is a robot project
-        if main_file.exists():
+        if os.path.isfile(main_file):
             prefs.write(project_path)
         else:
             logger.info(
@@ -3,6 +3,7 @@ import contextlib
 import hashlib
 import json
 import logging
+import os
 import pathlib
 import socket
 import sys
@@ -27,6 +28,17 @@ def md5sum(fname):
     return md5.hexdigest()
 
 
+def _preallocate(fp, size: int):
+    # Allocate the whole file up front instead of growing it one write at
+    # a time (posix_fallocate isn't available on Windows or macOS)
+    if size > 0 and hasattr(os, "posix_fallocate"):
+        try:
+            os.posix_fallocate(fp.fileno(), 0, size)
+        except OSError:
+            # not supported by every filesystem
+            pass
+
+
 def _urlretrieve(
     url,
     fname: pathlib.Path,
@@ -57,7 +69,9 @@ def _urlretrieve(
             except Exception:
                 pass
 
-    blocksize = 1024 * 8
+    # Large blocks keep the number of read/write calls down for the big
+    # files we download (python ipk, package indexes)
+    blocksize = 1024 * 1024
 
     def _reporthook(read, totalsize):
         if totalsize > 0:
@@ -93,6 +107,7 @@ def _urlretrieve(
                 read = 0
                 if "content-length" in headers:
                     size = int(headers["Content-Length"])
+                    _preallocate(dfp, size)
 
                 while True:
                     block = rfp.read(blocksize)
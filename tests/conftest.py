@@ -0,0 +1,83 @@
+import io
+
+import pytest
+
+from robotpy_installer.sshcontroller import SshController, SshExecResult
+
+
+class _Buffer(io.BytesIO):
+    # keeps the data around after the tar stream closes it
+    def close(self):
+        self.data = self.getvalue()
+        super().close()
+
+
+class _FakeChannel:
+    def __init__(self, stdin: io.BytesIO, output: bytes, retval: int):
+        self.stdin = stdin
+        self.output = output
+        self.retval = retval
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def set_combine_stderr(self, combine):
+        pass
+
+    def exec_command(self, cmd):
+        pass
+
+    def makefile(self, mode):
+        return self.stdin if mode == "wb" else io.BytesIO(self.output)
+
+    def shutdown_write(self):
+        pass
+
+    def exit_status_ready(self):
+        return True
+
+    def recv_exit_status(self):
+        return self.retval
+
+
+class _FakeTransport:
+    def __init__(self):
+        self.stdin: io.BytesIO = _Buffer()
+        self.output = b""
+        self.retval = 0
+
+    def open_session(self):
+        return _FakeChannel(self.stdin, self.output, self.retval)
+
+
+class FakeSsh:
+    """
+    Stands in for SshController. Commands are recorded and return stdout,
+    and tar_upload writes the archive to transport.stdin
+    """
+
+    hostname = "roborio"
+
+    def __init__(self):
+        self.transport = _FakeTransport()
+        self.stdout = ""
+        self.commands = []
+
+    def exec_cmd(self, cmd, **kwargs):
+        self.commands.append(cmd)
+        return SshExecResult(0, self.stdout)
+
+    def exec_bash(self, *commands, **kwargs):
+        self.commands.append(commands)
+        return SshExecResult(0, self.stdout)
+
+    def tar_upload(self, remote_path):
+        return SshController.tar_upload(self, remote_path)  # type: ignore
+
+
+@pytest.fixture
+def ssh() -> FakeSsh:
+    return FakeSsh()
@@ -0,0 +1,129 @@
+import argparse
+import io
+import os
+import pathlib
+import sys
+import tarfile
+
+import pytest
+
+from robotpy_installer.cli_deploy import Deploy
+from robotpy_installer.errors import SshExecError
+
+
+class _ClosedBuffer(io.BytesIO):
+    # what paramiko raises once the remote command has exited
+    def write(self, data):
+        raise OSError("Socket is closed")
+
+
+@pytest.fixture
+def project(tmp_path: pathlib.Path) -> pathlib.Path:
+    (tmp_path / "ext").mkdir()
+    (tmp_path / "ext" / "shared.py").write_text("SHARED = 1\n")
+
+    project = tmp_path / "project"
+    project.mkdir()
+    (project / "robot.py").write_text("import shared\n")
+    (project / "shared.py").symlink_to(os.path.join("..", "ext", "shared.py"))
+    (project / "logs").mkdir()
+    (project / "logs" / ".gitkeep").write_text("")
+    (project / "sub").mkdir()
+    (project / "sub" / "util.py").write_text("x = 1\n")
+    (project / "sub" / "util.pyc").write_bytes(b"")
+    (project / ".git").mkdir()
+    (project / ".git" / "HEAD").write_text("")
+    (project / "__pycache__").mkdir()
+    (project / "__pycache__" / "robot.pyc").write_bytes(b"")
+    return project
+
+
+def test_iter_upload_files(project: pathlib.Path):
+    deploy = Deploy(argparse.ArgumentParser())
+    found = {
+        arcname.replace(os.sep, "/"): entry.is_dir()
+        for entry, arcname in deploy._iter_upload_files(project)
+    }
+    assert found == {
+        "robot.py": False,
+        "shared.py": False,
+        "logs": True,
+        "sub": True,
+        "sub/util.py": False,
+    }
+
+
+def test_deploy_tar(project: pathlib.Path, ssh):
+    deploy = Deploy(argparse.ArgumentParser())
+    assert deploy._do_deploy(ssh, False, False, False, "robot.py", project)  # type: ignore
+
+    with tarfile.open(fileobj=io.BytesIO(ssh.transport.stdin.data)) as tar:
+        members = {m.name: m for m in tar.getmembers()}
+
+        assert members["py_new/logs"].isdir()
+        assert members["py_new/sub"].isdir()
+
+        # symlinks are uploaded as the file they point to
+        shared = members["py_new/shared.py"]
+        assert shared.isfile()
+        fp = tar.extractfile(shared)
+        assert fp is not None
+        assert fp.read() == b"SHARED = 1\n"
+
+        assert "py_new/logs/.gitkeep" not in members
+        assert "py_new/sub/util.pyc" not in members
+        assert "py_new/deploy.json" in members
+
+
+def test_deploy_tar_pyc(project: pathlib.Path, ssh, monkeypatch: pytest.MonkeyPatch):
+    # pretend that the robot has the same python version, so that the .pyc
+    # files are compiled locally
+    from robotpy_installer import installer
+
+    monkeypatch.setattr(
+        installer,
+        "_ROBOTPY_PYTHON_VERSION_NUM",
+        sys.implementation.cache_tag.split("-")[-1],
+    )
+
+    deploy = Deploy(argparse.ArgumentParser())
+    assert deploy._do_deploy(ssh, False, False, False, "robot.py", project)  # type: ignore
+
+    with tarfile.open(fileobj=io.BytesIO(ssh.transport.stdin.data)) as tar:
+        names = set(tar.getnames())
+
+    tag = sys.implementation.cache_tag
+    assert f"py_new/__pycache__/robot.{tag}.opt-1.pyc" in names
+    assert f"py_new/__pycache__/shared.{tag}.opt-1.pyc" in names
+    assert f"py_new/sub/__pycache__/util.{tag}.opt-1.pyc" in names
+
+
+def test_deploy_pyc_error(project: pathlib.Path, ssh, monkeypatch: pytest.MonkeyPatch):
+    from robotpy_installer import installer
+    from robotpy_installer.errors import Error
+
+    monkeypatch.setattr(
+        installer,
+        "_ROBOTPY_PYTHON_VERSION_NUM",
+        sys.implementation.cache_tag.split("-")[-1],
+    )
+
+    (project / "sub" / "util.py").write_text("def broken(:\n")
+
+    deploy = Deploy(argparse.ArgumentParser())
+    with pytest.raises(Error, match="could not compile"):
+        deploy._do_deploy(ssh, False, False, False, "robot.py", project)  # type: ignore
+
+    # the robot code must not have been replaced or restarted
+    assert not any("frcKillRobot" in cmd for cmd in ssh.commands)
+
+
+def test_tar_upload_remote_exit(project: pathlib.Path, ssh):
+    # mkdir failed, so the remote command is gone before the tar is written
+    ssh.transport.stdin = _ClosedBuffer()
+    ssh.transport.output = b"mkdir: cannot create directory '/home/lvuser/py'\n"
+    ssh.transport.retval = 1
+
+    with pytest.raises(SshExecError, match="mkdir: cannot create directory"):
+        with ssh.tar_upload("/home/lvuser/py") as tar:
+            tar.add(str(project / "robot.py"), arcname="robot.py")
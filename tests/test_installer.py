@@ -0,0 +1,139 @@
+import json
+import os
+import pathlib
+import time
+
+import pytest
+
+from packaging.version import Version
+
+from robotpy_installer import cli_installer, installer
+from robotpy_installer.installer import InstallerException, RobotpyInstaller
+
+
+def test_do_ops():
+    todo = cli_installer._parse_do_ops(
+        [
+            "install-python",
+            "install:numpy>=1.0,<2",
+            "install:pyyaml",
+            "list",
+            "uninstall:pkg @ https://example.com/pkg.whl",
+            "install:numpy",
+        ]
+    )
+    assert todo == [
+        (cli_installer._do_install_python, []),
+        (cli_installer._do_install, ["numpy>=1.0,<2", "pyyaml"]),
+        (cli_installer._do_list, []),
+        (cli_installer._do_uninstall, ["pkg @ https://example.com/pkg.whl"]),
+        (cli_installer._do_install, ["numpy"]),
+    ]
+
+
+@pytest.mark.parametrize(
+    "op,msg",
+    [
+        ("bad", "unknown operation"),
+        ("install", "requires a package"),
+        ("install:", "requires a package"),
+        ("list:numpy", "does not accept packages"),
+    ],
+)
+def test_do_ops_invalid(op: str, msg: str):
+    with pytest.raises(InstallerException, match=msg):
+        cli_installer._parse_do_ops(["list", op])
+
+
+def _installer(ssh) -> RobotpyInstaller:
+    installer = RobotpyInstaller(log_startup=False)
+    installer._ssh = ssh
+    return installer
+
+
+def test_robot_status(ssh):
+    ssh.stdout = (
+        "robotpy-status:image\n"
+        'IMAGEVERSION = "FRC_roboRIO2_2025_v1.1"\n'
+        "robotpy-status:df\n"
+        "/dev/root  3.7G  1.2G  2.3G  35% /\n"
+        "robotpy-status:meminfo\n"
+        "MemTotal:  246552 kB\n"
+        "MemAvailable:  123276 kB\n"
+    )
+    installer = _installer(ssh)
+
+    status = installer._get_robot_status("image", "df", "meminfo")
+    assert status == {
+        "image": 'IMAGEVERSION = "FRC_roboRIO2_2025_v1.1"\n',
+        "df": "/dev/root  3.7G  1.2G  2.3G  35% /\n",
+        "meminfo": "MemTotal:  246552 kB\nMemAvailable:  123276 kB\n",
+    }
+
+    installer.ensure_image_version(False, status["image"])
+    assert installer.show_disk_space(status["df"]) == ("3.7G", "1.2G", "35%")
+
+
+def test_robot_status_missing(ssh):
+    ssh.stdout = (
+        "robotpy-status:image\n"
+        "grep: /etc/natinst/share/scs_imagemetadata.ini: No such file\n"
+        "robotpy-status:df\n"
+    )
+    installer = _installer(ssh)
+
+    with pytest.raises(InstallerException, match="no output from 'df"):
+        installer._get_robot_status("image", "df")
+
+
+def test_robot_status_none(ssh):
+    installer = _installer(ssh)
+    assert installer._get_robot_status() == {}
+    assert ssh.commands == []
+
+
+@pytest.fixture
+def pypi(tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch):
+    fetched = []
+
+    def _urlretrieve(url, fname, *args):
+        fetched.append(url)
+        fname.write_text(json.dumps({"versions": ["2025.1.0", "2025.2.0"]}))
+
+    monkeypatch.setattr(installer, "_urlretrieve", _urlretrieve)
+
+    inst = RobotpyInstaller(log_startup=False)
+    inst.cache_root = tmp_path
+    return inst, tmp_path / "pypi-robotpy.json", fetched
+
+
+def test_pypi_version_fresh(pypi):
+    inst, fname, fetched = pypi
+    fname.write_text(json.dumps({"versions": ["2025.1.0"]}))
+
+    assert inst.get_pypi_version("robotpy", False) == Version("2025.1.0")
+    assert fetched == []
+
+
+def test_pypi_version_stale(pypi):
+    inst, fname, fetched = pypi
+    fname.write_text(json.dumps({"versions": ["2025.1.0"]}))
+    old = time.time() - 2 * installer._PYPI_CACHE_TTL
+    os.utime(fname, (old, old))
+
+    assert inst.get_pypi_version("robotpy", False) == Version("2025.2.0")
+    assert fetched == ["https://pypi.org/simple/robotpy"]
+    assert time.time() - fname.stat().st_mtime < installer._PYPI_CACHE_TTL
+
+
+@pytest.mark.parametrize(
+    "content",
+    [b'{"versions": ["2025.1', b'{"versions": ["2025.1.0"]}' + b"\0" * 64],
+    ids=["truncated", "nul-padded"],
+)
+def test_pypi_version_corrupt(pypi, content: bytes):
+    inst, fname, fetched = pypi
+    fname.write_bytes(content)
+
+    assert inst.get_pypi_version("robotpy", False) == Version("2025.2.0")
+    assert fetched == ["https://pypi.org/simple/robotpy"]
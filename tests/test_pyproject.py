@@ -110,3 +110,23 @@ def test_env_marker():
         True,
         [],
     )
+
+
+def test_install_list_dedup():
+    project = load_project(
+        f"""
+        [tool.robotpy]
+        robotpy_version = "{YEAR}.1.1.2"
+        requires = [
+            "numpy",
+            "pyyaml",
+            "numpy"
+        ]
+    """
+    )
+
+    assert project.get_install_list() == [
+        f"robotpy=={YEAR}.1.1.2",
+        "numpy",
+        "pyyaml",
+    ]
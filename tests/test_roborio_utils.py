@@ -0,0 +1,71 @@
+import hashlib
+import json
+
+import pytest
+
+from robotpy_installer import roborio_utils
+from robotpy_installer.errors import Error
+
+
+def _kill_md5() -> str:
+    return hashlib.md5(roborio_utils.get_kill_script()).hexdigest()
+
+
+def test_probe_deploy_state(ssh):
+    packages = {"robotpy": "2025.1.1", "pyntcore": "2025.1.1"}
+    ssh.stdout = (
+        "+ rm -rf /home/lvuser/*.jar\n"
+        f"robotpy-probe:kill_md5={_kill_md5()}  /usr/local/frc/bin/frcKillRobot.sh\n"
+        "robotpy-probe:cpp_java=1\n"
+        "robotpy-probe:python=1\n"
+        f"robotpy-probe:packages={json.dumps(packages)}\n"
+    )
+
+    state = roborio_utils.probe_deploy_state(ssh, get_py_packages=True)  # type: ignore
+    assert state == roborio_utils.DeployState(
+        kill_script_updated=True,
+        cpp_java_exists=True,
+        python_exists=True,
+        py_packages=packages,
+    )
+
+    (commands,) = ssh.commands
+    assert any("/usr/local/bin/python3 -c" in cmd for cmd in commands)
+
+
+def test_probe_deploy_state_fresh_robot(ssh):
+    ssh.stdout = (
+        "robotpy-probe:kill_md5=\n"
+        "robotpy-probe:cpp_java=0\n"
+        "robotpy-probe:python=0\n"
+    )
+
+    state = roborio_utils.probe_deploy_state(ssh)  # type: ignore
+    assert state == roborio_utils.DeployState(
+        kill_script_updated=False,
+        cpp_java_exists=False,
+        python_exists=False,
+        py_packages=None,
+    )
+
+    (commands,) = ssh.commands
+    assert not any("/usr/local/bin/python3 -c" in cmd for cmd in commands)
+
+
+def test_probe_deploy_state_bad_packages(ssh):
+    ssh.stdout = (
+        f"robotpy-probe:kill_md5={_kill_md5()}  /usr/local/frc/bin/frcKillRobot.sh\n"
+        "robotpy-probe:cpp_java=0\n"
+        "robotpy-probe:python=1\n"
+        "robotpy-probe:packages=Traceback (most recent call last):\n"
+    )
+
+    state = roborio_utils.probe_deploy_state(ssh, get_py_packages=True)  # type: ignore
+    assert state.py_packages is None
+
+
+def test_probe_deploy_state_unexpected(ssh):
+    ssh.stdout = "bash: md5sum: command not found\n"
+
+    with pytest.raises(Error, match="unexpected output"):
+        roborio_utils.probe_deploy_state(ssh)  # type: ignore